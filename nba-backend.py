@@ -1,12 +1,285 @@
-from flask import Flask, jsonify
+from flask import Flask, jsonify, request
 from flask_cors import CORS
 import requests
-from datetime import datetime, timedelta
+import os
+import json
+import sys
+import math
+import time
+import argparse
+import bisect
+import tempfile
+import queue
+import threading
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from array import array
+from collections import OrderedDict
+from urllib.parse import urlparse
+from datetime import datetime, timedelta, timezone
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    from zoneinfo import ZoneInfo
+    ESPN_TZ = ZoneInfo('America/New_York')
+except Exception:
+    # No tz database available; standard-time Eastern is close enough for date math
+    ESPN_TZ = timezone(timedelta(hours=-5))
 
 app = Flask(__name__)
 CORS(app)
 
 ESPN_API = "https://site.api.espn.com/apis/site/v2/sports/basketball/nba"
+DATA_DIR = os.environ.get('NBA_HUB_DATA_DIR', 'data')
+ARCHIVE_DIR = os.path.join(DATA_DIR, 'archive')
+
+# Statuses after which a game's scoreboard entry will not change again
+SETTLED_STATUSES = {'STATUS_FINAL', 'STATUS_POSTPONED', 'STATUS_CANCELED', 'STATUS_FORFEIT'}
+
+# ========================================
+# UPSTREAM RATE LIMITING
+# ========================================
+PRIORITY_LIVE = 'live'
+PRIORITY_DEFAULT = 'default'
+PRIORITY_BACKGROUND = 'background'
+
+# Share of each bucket's burst that a priority class must leave untouched,
+# so background fetches yield to route traffic and both yield to live scores
+PRIORITY_RESERVE = {PRIORITY_LIVE: 0.0, PRIORITY_DEFAULT: 0.25, PRIORITY_BACKGROUND: 0.5}
+
+# Longest a request queues for a token before falling back (None = no limit)
+PRIORITY_MAX_WAIT = {PRIORITY_LIVE: 2.0, PRIORITY_DEFAULT: 1.0, PRIORITY_BACKGROUND: None}
+
+# (requests per second, burst) per upstream host
+UPSTREAM_LIMITS = {
+    'site.api.espn.com': (10.0, 20),
+    'stats.nba.com': (1.0, 3),
+    'www.reddit.com': (0.5, 5)
+}
+DEFAULT_UPSTREAM_LIMIT = (5.0, 10)
+
+SNAPSHOT_LIMIT = 256
+
+
+class UpstreamThrottled(Exception):
+    """Raised when no token was available in time and no snapshot exists"""
+
+
+class _FileLock:
+    """Cross-process exclusive lock (no-op where fcntl is unavailable)"""
+
+    def __init__(self, path):
+        self.path = path
+        self.handle = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self.handle = open(self.path, 'a')
+            fcntl.flock(self.handle, fcntl.LOCK_EX)
+        return self
+
+    def try_acquire(self):
+        """Take the lock without blocking and hold it until released"""
+        if fcntl is None:
+            return True
+        handle = open(self.path, 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self.handle = handle
+        return True
+
+    def __exit__(self, *exc):
+        if self.handle is not None:
+            fcntl.flock(self.handle, fcntl.LOCK_UN)
+            self.handle.close()
+            self.handle = None
+
+
+class UpstreamLimiter:
+    """Token bucket for one upstream host, shared by every route and worker.
+
+    Bucket state lives in a small file under DATA_DIR guarded by an flock, so
+    all gunicorn workers (and the backfill CLI) draw from the same budget.
+    Lower priority classes must leave PRIORITY_RESERVE of the burst behind,
+    which lets live-score fetches through first when the budget runs low.
+    """
+
+    def __init__(self, host, rate, burst):
+        self.host = host
+        self.rate = float(rate)
+        self.burst = float(burst)
+        directory = os.path.join(DATA_DIR, 'ratelimit')
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{host}.json")
+        self.lock = threading.Lock()
+        self.local_state = None
+        self.stats = {priority: {'admitted': 0, 'throttled': 0, 'waitSeconds': 0.0}
+                      for priority in PRIORITY_RESERVE}
+
+    def _read(self):
+        if fcntl is None:
+            return self.local_state or {'tokens': self.burst, 'updated': time.time()}
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'tokens': self.burst, 'updated': time.time()}
+
+    def _write(self, state):
+        if fcntl is None:
+            self.local_state = state
+            return
+        with open(self.path, 'w') as f:
+            json.dump(state, f)
+
+    def _refill(self, state):
+        now = time.time()
+        elapsed = max(0.0, now - state['updated'])
+        return {'tokens': min(self.burst, state['tokens'] + elapsed * self.rate), 'updated': now}
+
+    def try_acquire(self, priority):
+        """Take a token if one is free for this priority; else return seconds to wait"""
+        floor = 1 + PRIORITY_RESERVE[priority] * self.burst
+        with self.lock, _FileLock(self.path + '.lock'):
+            state = self._refill(self._read())
+            if state['tokens'] >= floor:
+                state['tokens'] -= 1
+                self._write(state)
+                return 0.0
+            self._write(state)
+            return (floor - state['tokens']) / self.rate
+
+    def acquire(self, priority=PRIORITY_DEFAULT, max_wait=None):
+        """Wait up to max_wait seconds for a token; returns False on timeout"""
+        started = time.monotonic()
+        while True:
+            needed = self.try_acquire(priority)
+            waited = time.monotonic() - started
+            if needed == 0:
+                with self.lock:
+                    self.stats[priority]['admitted'] += 1
+                    self.stats[priority]['waitSeconds'] += waited
+                return True
+            if max_wait is not None and waited + needed > max_wait:
+                with self.lock:
+                    self.stats[priority]['throttled'] += 1
+                return False
+            time.sleep(min(needed, 0.5))
+
+    def pause(self, seconds=0.0):
+        """Empty the shared bucket (and keep it empty for `seconds`) after a 429"""
+        with self.lock, _FileLock(self.path + '.lock'):
+            self._write({'tokens': -seconds * self.rate, 'updated': time.time()})
+
+    def snapshot(self):
+        with self.lock, _FileLock(self.path + '.lock'):
+            state = self._refill(self._read())
+            stats = {priority: dict(values, waitSeconds=round(values['waitSeconds'], 3))
+                     for priority, values in self.stats.items()}
+        return {
+            'host': self.host,
+            'rate': self.rate,
+            'burst': self.burst,
+            'tokens': round(state['tokens'], 2),
+            'priorities': stats
+        }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+_snapshots = OrderedDict()
+_snapshots_lock = threading.Lock()
+_snapshot_hits = {}
+
+
+def get_limiter(host):
+    with _limiters_lock:
+        if host not in _limiters:
+            rate, burst = UPSTREAM_LIMITS.get(host, DEFAULT_UPSTREAM_LIMIT)
+            _limiters[host] = UpstreamLimiter(host, rate, burst)
+        return _limiters[host]
+
+
+def _last_snapshot(host, url):
+    with _snapshots_lock:
+        data = _snapshots.get(url)
+        if data is not None:
+            _snapshot_hits[host] = _snapshot_hits.get(host, 0) + 1
+        return data
+
+
+def _retry_after(response):
+    try:
+        return max(0.0, float(response.headers.get('Retry-After', 0)))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def fetch_json(url, priority=PRIORITY_DEFAULT, headers=None, timeout=10, max_wait=-1, snapshot=None):
+    """GET an upstream JSON payload through that host's shared rate limiter.
+
+    If no token frees up within the priority's wait budget, or the upstream
+    answers 429, the last good payload for this URL is returned instead. A 429
+    also empties the host's shared bucket for its Retry-After period. Payloads
+    are kept as snapshots unless `snapshot` is False (default: not for
+    background fetches).
+    """
+    host = urlparse(url).netloc
+    limiter = get_limiter(host)
+    if max_wait == -1:
+        max_wait = PRIORITY_MAX_WAIT[priority]
+    if snapshot is None:
+        snapshot = priority != PRIORITY_BACKGROUND
+
+    if not limiter.acquire(priority, max_wait):
+        data = _last_snapshot(host, url)
+        if data is None:
+            raise UpstreamThrottled(f"{host} rate limit exceeded")
+        return data
+
+    response = requests.get(url, headers=headers, timeout=timeout)
+    if response.status_code == 429:
+        limiter.pause(_retry_after(response))
+        data = _last_snapshot(host, url)
+        if data is not None:
+            return data
+    response.raise_for_status()
+    data = response.json()
+
+    if snapshot:
+        with _snapshots_lock:
+            _snapshots[url] = data
+            _snapshots.move_to_end(url)
+            while len(_snapshots) > SNAPSHOT_LIMIT:
+                _snapshots.popitem(last=False)
+    return data
+
+
+@app.route('/api/ratelimits', methods=['GET'])
+def get_ratelimits():
+    """Get each upstream bucket's state and this worker's admission counters"""
+    try:
+        for host in UPSTREAM_LIMITS:
+            get_limiter(host)
+        with _limiters_lock:
+            limiters = list(_limiters.values())
+        buckets = []
+        for limiter in limiters:
+            bucket = limiter.snapshot()
+            bucket['snapshotsServed'] = _snapshot_hits.get(limiter.host, 0)
+            buckets.append(bucket)
+        return jsonify({'success': True, 'pid': os.getpid(), 'buckets': buckets})
+    except Exception as e:
+        print(f"Rate limit stats error: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
 
 # ========================================
 # GAMES (Already Working!)
@@ -28,8 +301,7 @@ def get_games():
             url = f"{ESPN_API}/scoreboard?dates={date_str}"
             
             try:
-                response = requests.get(url, timeout=10)
-                data = response.json()
+                data = fetch_json(url, priority=PRIORITY_LIVE)
                 
                 for event in data.get('events', []):
                     comp = event['competitions'][0]
@@ -55,6 +327,8 @@ def get_games():
                         'time': date.strftime('%B %d, %Y')
                     })
                 
+                index_scoreboard(data, date_str)
+                
             except Exception as e:
                 print(f"Error fetching date {date_str}: {e}")
                 continue
@@ -75,8 +349,8 @@ def get_game_stats(game_id):
     """Get game stats using ESPN's key mapping"""
     try:
         url = f"{ESPN_API}/summary?event={game_id}"
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        data = fetch_json(url, priority=PRIORITY_LIVE)
+        index_summary(game_id, data)
         
         top_performers = []
         
@@ -154,8 +428,7 @@ def get_news():
     """Get NBA news from ESPN"""
     try:
         url = f"{ESPN_API}/news"
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        data = fetch_json(url)
         
         news = []
         for article in data.get('articles', [])[:10]:
@@ -218,8 +491,7 @@ def get_social():
         reddit_url = "https://www.reddit.com/r/nba/hot.json?limit=15"
         headers = {'User-Agent': 'NBA-Hub/1.0'}
         
-        response = requests.get(reddit_url, headers=headers, timeout=10)
-        data = response.json()
+        data = fetch_json(reddit_url, headers=headers)
         
         posts = []
         for post_data in data.get('data', {}).get('children', []):
@@ -273,8 +545,7 @@ def get_standings():
     """Get accurate NBA standings from ESPN"""
     try:
         url = f"{ESPN_API}/standings"
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        data = fetch_json(url)
         
         all_teams = []
         
@@ -358,8 +629,7 @@ def get_players():
                 # NBA Stats API endpoint
                 url = f"https://stats.nba.com/stats/leagueLeaders?LeagueID=00&PerMode=PerGame&Scope=S&Season=2025-26&SeasonType=Regular+Season&StatCategory={stat_abbr}"
                 
-                response = requests.get(url, headers=headers, timeout=10)
-                data = response.json()
+                data = fetch_json(url, headers=headers)
                 
                 if 'resultSet' in data:
                     headers_list = data['resultSet']['headers']
@@ -426,8 +696,7 @@ def get_schedule():
             url = f"{ESPN_API}/scoreboard?dates={date_str}"
             
             try:
-                response = requests.get(url, timeout=10)
-                data = response.json()
+                data = fetch_json(url)
                 
                 for event in data.get('events', []):
                     comp = event['competitions'][0]
@@ -472,8 +741,7 @@ def get_playoffs():
         if current_month >= 4 and current_month <= 6:
             # Get playoff bracket/games
             url = f"{ESPN_API}/scoreboard"
-            response = requests.get(url, timeout=10)
-            data = response.json()
+            data = fetch_json(url)
             
             playoffs_info = {
                 'active': True,
@@ -483,8 +751,7 @@ def get_playoffs():
         else:
             # Show playoff race - teams 1-10 in each conference
             url = f"{ESPN_API}/standings"
-            response = requests.get(url, timeout=10)
-            data = response.json()
+            data = fetch_json(url)
             
             playoff_race = {'Eastern': [], 'Western': []}
             
@@ -535,8 +802,7 @@ def get_stats():
     """Get league-wide statistics"""
     try:
         url = f"{ESPN_API}/scoreboard"
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        data = fetch_json(url)
         
         total_points = 0
         game_count = 0
@@ -573,8 +839,7 @@ def get_highlights():
     """Get highlight videos from ESPN"""
     try:
         url = f"{ESPN_API}/news"
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        data = fetch_json(url)
         
         highlights = []
         
@@ -644,21 +909,28 @@ def get_archive():
             date_str = date.strftime('%Y%m%d')
             url = f"{ESPN_API}/scoreboard?dates={date_str}"
             
-            response = requests.get(url, timeout=10)
-            data = response.json()
-            
-            for event in data.get('events', [])[:3]:
-                comp = event['competitions'][0]
-                home = comp['competitors'][0]
-                away = comp['competitors'][1]
+            try:
+                # Past dates rarely change, so prefer the backfill archive
+                data = load_archived('scoreboard', date_str)
+                if data is None:
+                    data = fetch_json(url, priority=PRIORITY_BACKGROUND, max_wait=1.0, snapshot=True)
                 
-                if comp['status']['type']['name'] == 'STATUS_FINAL':
-                    archive.append({
-                        'date': date.strftime('%b %d'),
-                        'home': home['team']['displayName'],
-                        'away': away['team']['displayName'],
-                        'score': f"{away.get('score', 0)}-{home.get('score', 0)}"
-                    })
+                for event in data.get('events', [])[:3]:
+                    comp = event['competitions'][0]
+                    home = comp['competitors'][0]
+                    away = comp['competitors'][1]
+                    
+                    if comp['status']['type']['name'] == 'STATUS_FINAL':
+                        archive.append({
+                            'date': date.strftime('%b %d'),
+                            'home': home['team']['displayName'],
+                            'away': away['team']['displayName'],
+                            'score': f"{away.get('score', 0)}-{home.get('score', 0)}"
+                        })
+                    
+            except Exception as e:
+                print(f"Error fetching archive for {date_str}: {e}")
+                continue
         
         return jsonify({'success': True, 'archive': archive[:20]})
     except Exception as e:
@@ -668,16 +940,284 @@ def get_archive():
 # ========================================
 # BETTING
 # ========================================
+class OddsStore:
+    """Append-only columnar store of spread / over-under snapshots.
+
+    Each column lives in its own fixed-width binary file so a refresh is a
+    handful of small appends, and history / mover queries read straight from
+    in-memory arrays instead of re-fetching scoreboards. Rows are only written
+    when a game's line actually changes. Other processes (gunicorn workers)
+    appending to the same files are picked up on the next read.
+    """
+
+    COLUMNS = (('ts', 'd'), ('game', 'q'), ('spread', 'f'), ('total', 'f'))
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.lock = threading.Lock()
+        self.columns = {name: array(code) for name, code in self.COLUMNS}
+        self.rows_by_game = {}
+        self.games = {}
+        self.games_mtime = None
+        os.makedirs(directory, exist_ok=True)
+        self.lock_path = os.path.join(directory, 'odds.lock')
+        with self.lock, self._file_lock():
+            self._sync(repair=True)
+
+    def _path(self, name):
+        return os.path.join(self.directory, f"odds_{name}.bin")
+
+    def _file_lock(self):
+        return _FileLock(self.lock_path)
+
+    def _sync(self, repair=False):
+        """Load any rows appended to disk since the last sync"""
+        known = len(self.columns['ts'])
+        tails = {}
+        for name, code in self.COLUMNS:
+            path = self._path(name)
+            itemsize = array(code).itemsize
+            tail = array(code)
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    f.seek(known * itemsize)
+                    data = f.read()
+                tail.frombytes(data[:len(data) - len(data) % itemsize])
+            tails[name] = tail
+
+        # A crash mid-append can leave columns uneven; keep complete rows only
+        complete = min(len(tail) for tail in tails.values())
+        for name, code in self.COLUMNS:
+            del tails[name][complete:]
+            if repair and os.path.exists(self._path(name)):
+                with open(self._path(name), 'r+b') as f:
+                    f.truncate((known + complete) * array(code).itemsize)
+            self.columns[name].extend(tails[name])
+
+        game_col = self.columns['game']
+        for row in range(known, known + complete):
+            self.rows_by_game.setdefault(game_col[row], []).append(row)
+
+        games_path = os.path.join(self.directory, 'odds_games.json')
+        if os.path.exists(games_path) and os.path.getmtime(games_path) != self.games_mtime:
+            self.games_mtime = os.path.getmtime(games_path)
+            try:
+                with open(games_path) as f:
+                    self.games.update({int(k): v for k, v in json.load(f).items()})
+            except (OSError, ValueError) as e:
+                # Team names are cosmetic; never let a bad file stop startup
+                print(f"Ignoring unreadable {games_path}: {e}")
+
+    def append(self, game_id, spread, total, ts=None, home=None, away=None):
+        """Record a snapshot, skipping it if the line has not moved"""
+        game = int(game_id)
+        spread = float('nan') if spread is None else float(spread)
+        total = float('nan') if total is None else float(total)
+
+        with self.lock, self._file_lock():
+            self._sync()
+            info = {'home': home, 'away': away}
+            if (home or away) and self.games.get(game) != info:
+                self.games[game] = info
+                games_path = os.path.join(self.directory, 'odds_games.json')
+                _write_json(games_path, self.games)
+                self.games_mtime = os.path.getmtime(games_path)
+
+            rows = self.rows_by_game.get(game)
+            if rows:
+                last = rows[-1]
+                if (_same_line(self.columns['spread'][last], spread)
+                        and _same_line(self.columns['total'][last], total)):
+                    return False
+
+            values = {'ts': ts if ts is not None else time.time(), 'game': game,
+                      'spread': spread, 'total': total}
+            # Encode every column before touching disk so a bad value can't
+            # leave one column a row ahead of the others
+            row = {name: array(code, [values[name]]) for name, code in self.COLUMNS}
+
+            known = len(self.columns['ts'])
+            try:
+                for name, code in self.COLUMNS:
+                    with open(self._path(name), 'ab') as f:
+                        f.write(row[name].tobytes())
+            except Exception:
+                for name, code in self.COLUMNS:
+                    if os.path.exists(self._path(name)):
+                        with open(self._path(name), 'r+b') as f:
+                            f.truncate(known * row[name].itemsize)
+                raise
+
+            for name, code in self.COLUMNS:
+                self.columns[name].extend(row[name])
+            self.rows_by_game.setdefault(game, []).append(known)
+            return True
+
+    def history(self, game_id):
+        """Return every recorded snapshot for a game, oldest first"""
+        with self.lock, self._file_lock():
+            self._sync()
+            rows = list(self.rows_by_game.get(int(game_id), []))
+        return [{
+            'time': datetime.fromtimestamp(self.columns['ts'][row], timezone.utc).isoformat(),
+            'spread': _line_value(self.columns['spread'][row]),
+            'overUnder': _line_value(self.columns['total'][row])
+        } for row in rows]
+
+    def movers(self, limit):
+        """Return the games whose spread or total moved the most"""
+        with self.lock, self._file_lock():
+            self._sync()
+            games = {game: (rows[0], rows[-1]) for game, rows in self.rows_by_game.items()
+                     if len(rows) > 1}
+
+        movers = []
+        for game, (first, last) in games.items():
+            spread_move = _line_move(self.columns['spread'], first, last)
+            total_move = _line_move(self.columns['total'], first, last)
+            magnitude = max(abs(spread_move or 0), abs(total_move or 0))
+            if magnitude == 0:
+                continue
+            info = self.games.get(game, {})
+            movers.append({
+                'id': str(game),
+                'home': info.get('home'),
+                'away': info.get('away'),
+                'openSpread': _line_value(self.columns['spread'][first]),
+                'spread': _line_value(self.columns['spread'][last]),
+                'spreadMove': spread_move,
+                'openOverUnder': _line_value(self.columns['total'][first]),
+                'overUnder': _line_value(self.columns['total'][last]),
+                'overUnderMove': total_move,
+                'snapshots': len(self.rows_by_game[game]),
+                '_magnitude': magnitude
+            })
+
+        movers.sort(key=lambda x: x['_magnitude'], reverse=True)
+        for mover in movers:
+            del mover['_magnitude']
+        return movers[:limit]
+
+
+def _same_line(old, new):
+    if math.isnan(old) and math.isnan(new):
+        return True
+    return old == new
+
+
+def _line_value(value):
+    return None if math.isnan(value) else round(value, 1)
+
+
+def _line_move(column, first, last):
+    start, end = column[first], column[last]
+    if math.isnan(start) or math.isnan(end):
+        return None
+    return round(end - start, 1)
+
+
+def parse_odds_line(comp):
+    """Pull (spread, overUnder) from a competition, spread from the home side"""
+    odds = comp.get('odds', [])
+    if not odds:
+        return None, None
+    line = odds[0]
+
+    total = line.get('overUnder')
+    try:
+        total = float(total) if total is not None else None
+    except (TypeError, ValueError):
+        total = None
+
+    spread = line.get('spread')
+    try:
+        spread = float(spread) if spread is not None else None
+    except (TypeError, ValueError):
+        spread = None
+
+    if spread is None:
+        # details looks like "BOS -5.5" (favorite's line) or "EVEN"
+        details = (line.get('details') or '').strip()
+        if details.upper() == 'EVEN':
+            spread = 0.0
+        else:
+            parts = details.split()
+            try:
+                value = float(parts[-1])
+                home_abbr = comp['competitors'][0]['team'].get('abbreviation')
+                spread = value if len(parts) < 2 or parts[0] == home_abbr else -value
+            except (IndexError, KeyError, ValueError):
+                spread = None
+
+    return spread, total
+
+
+def record_odds(data):
+    """Append an odds snapshot for every game in a scoreboard payload"""
+    for event in data.get('events', []):
+        try:
+            comp = event['competitions'][0]
+            spread, total = parse_odds_line(comp)
+            if spread is None and total is None:
+                continue
+            odds_store.append(
+                event['id'], spread, total,
+                home=comp['competitors'][0]['team']['displayName'],
+                away=comp['competitors'][1]['team']['displayName']
+            )
+        except Exception as e:
+            print(f"Error recording odds for {event.get('id')}: {e}")
+            continue
+
+
+def refresh_odds():
+    """Snapshot today's and tomorrow's lines"""
+    for days_ahead in (0, 1):
+        date_str = (datetime.now() + timedelta(days=days_ahead)).strftime('%Y%m%d')
+        url = f"{ESPN_API}/scoreboard?dates={date_str}"
+        try:
+            record_odds(fetch_json(url, priority=PRIORITY_BACKGROUND))
+        except Exception as e:
+            print(f"Error refreshing odds for {date_str}: {e}")
+
+
+def start_odds_refresher(interval):
+    """Refresh odds snapshots every `interval` seconds in a daemon thread.
+
+    Every worker starts one, but only the worker holding the refresher lock
+    polls ESPN; the others stand by and take over if that worker exits.
+    """
+    def loop():
+        leader = _FileLock(os.path.join(odds_store.directory, 'refresher.lock'))
+        while not leader.try_acquire():
+            time.sleep(interval)
+        while True:
+            refresh_odds()
+            time.sleep(interval)
+
+    thread = threading.Thread(target=loop, name='odds-refresher', daemon=True)
+    thread.start()
+    return thread
+
+
+ODDS_REFRESH_SECONDS = int(os.environ.get('ODDS_REFRESH_SECONDS', '300'))
+
+odds_store = OddsStore(os.path.join(DATA_DIR, 'odds'))
+
 @app.route('/api/betting', methods=['GET'])
 def get_betting():
-    """Get betting odds for upcoming games"""
+    """Get betting odds for upcoming games, or the biggest line movers"""
     try:
+        movers = request.args.get('movers', type=int)
+        if movers is not None:
+            return jsonify({'success': True, 'movers': odds_store.movers(max(movers, 0))})
+
         tomorrow = datetime.now() + timedelta(days=1)
         date_str = tomorrow.strftime('%Y%m%d')
         url = f"{ESPN_API}/scoreboard?dates={date_str}"
         
-        response = requests.get(url, timeout=10)
-        data = response.json()
+        data = fetch_json(url)
+        record_odds(data)
         
         betting = []
         
@@ -695,6 +1235,7 @@ def get_betting():
                 over_under = 'Check sportsbook'
             
             betting.append({
+                'id': event['id'],
                 'home': home,
                 'away': away,
                 'spread': spread,
@@ -714,6 +1255,596 @@ def get_betting():
         print(f"Betting error: {e}")
         return jsonify({'success': False, 'error': str(e)})
 
+@app.route('/api/betting/<game_id>/history', methods=['GET'])
+def get_betting_history(game_id):
+    """Get line movement for a single game"""
+    try:
+        history = odds_store.history(game_id)
+        return jsonify({'success': True, 'id': game_id, 'history': history})
+    except Exception as e:
+        print(f"Betting history error: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+# ========================================
+# BACKFILL (SEASON ARCHIVE)
+# ========================================
+def archive_path(kind, key):
+    """Location of an archived ESPN payload, e.g. ('scoreboard', '20251021')"""
+    return os.path.join(ARCHIVE_DIR, kind, f"{key}.json")
+
+
+def load_archived(kind, key):
+    """Return an archived payload, or None if it has not been backfilled"""
+    path = archive_path(kind, key)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_json(path, payload):
+    """Write JSON atomically so an interrupted run never leaves partial files"""
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    # Unique temp name: workers and the backfill may write the same file at once
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(payload, f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def season_dates(season):
+    """Every date from October 1 of `season` through June 30, stopping at yesterday (ET)"""
+    start = datetime(season, 10, 1)
+    yesterday = datetime.now(ESPN_TZ).replace(tzinfo=None) - timedelta(days=1)
+    end = min(datetime(season + 1, 6, 30), yesterday)
+    dates = []
+    while start <= end:
+        dates.append(start.strftime('%Y%m%d'))
+        start += timedelta(days=1)
+    return dates
+
+
+# How long a backfill request may queue for a token before it counts as a
+# failed attempt; it waits in short steps so Ctrl-C is noticed promptly
+BACKFILL_MAX_WAIT = 60
+BACKFILL_WAIT_STEP = 1.0
+
+
+def scoreboard_settled(data):
+    """True once every game on a scoreboard is final (or will never be played)"""
+    return all(event['competitions'][0]['status']['type']['name'] in SETTLED_STATUSES
+               for event in data.get('events', []))
+
+
+class SeasonBackfill:
+    """Fetch a season's scoreboards and final-game summaries into ARCHIVE_DIR.
+
+    Dates are only checkpointed once every game on them is settled and every
+    final summary is on disk, so re-running after an interruption picks up
+    exactly the unfinished dates (and skips summaries already saved).
+    Archived scoreboards that still have unsettled games are refetched.
+    """
+
+    def __init__(self, dates, workers=8, retries=3, checkpoint=None):
+        self.dates = dates
+        self.workers = workers
+        self.retries = retries
+        self.checkpoint = checkpoint or os.path.join(ARCHIVE_DIR, 'backfill_checkpoint.json')
+        self.done = set()
+        if os.path.exists(self.checkpoint):
+            with open(self.checkpoint) as f:
+                self.done = set(json.load(f).get('dates', []))
+        self.requests_made = 0
+        self.counter_lock = threading.Lock()
+        self.failed_dates = set()
+        self.unsettled_dates = set()
+        self.stopping = threading.Event()
+
+    def fetch(self, url):
+        for attempt in range(self.retries):
+            try:
+                return self._fetch_admitted(url)
+            except Exception as e:
+                if self.stopping.is_set() or attempt == self.retries - 1:
+                    raise
+                print(f"Retrying {url}: {e}")
+                self.stopping.wait(2 ** attempt)
+
+    def _fetch_admitted(self, url):
+        """Fetch at background priority from the shared ESPN bucket, queueing
+        for at most BACKFILL_MAX_WAIT seconds"""
+        deadline = time.monotonic() + BACKFILL_MAX_WAIT
+        while True:
+            if self.stopping.is_set():
+                raise RuntimeError('backfill interrupted')
+            try:
+                data = fetch_json(url, priority=PRIORITY_BACKGROUND, max_wait=BACKFILL_WAIT_STEP)
+            except UpstreamThrottled:
+                if time.monotonic() >= deadline:
+                    raise
+                self.stopping.wait(BACKFILL_WAIT_STEP)
+                continue
+            with self.counter_lock:
+                self.requests_made += 1
+            return data
+
+    def fetch_scoreboard(self, date_str):
+        """Store a date's scoreboard and return (final game ids, settled)"""
+        data = load_archived('scoreboard', date_str)
+        if data is None or not scoreboard_settled(data):
+            data = self.fetch(f"{ESPN_API}/scoreboard?dates={date_str}")
+            _write_json(archive_path('scoreboard', date_str), data)
+        final_ids = [event['id'] for event in data.get('events', [])
+                     if event['competitions'][0]['status']['type']['name'] == 'STATUS_FINAL']
+        return final_ids, scoreboard_settled(data)
+
+    def fetch_summary(self, game_id):
+        if load_archived('summary', game_id) is None:
+            data = self.fetch(f"{ESPN_API}/summary?event={game_id}")
+            _write_json(archive_path('summary', game_id), data)
+        return game_id
+
+    def save_checkpoint(self):
+        _write_json(self.checkpoint, {'dates': sorted(self.done)})
+
+    def report(self, started, total):
+        elapsed = time.monotonic() - started
+        finished = len(self.done & set(self.dates))
+        pending = total - finished
+        rate = self.requests_made / elapsed if elapsed else 0
+        completed_here = finished - self.already_done
+        eta = elapsed / completed_here * pending if completed_here else (0 if not pending else None)
+        eta_str = str(timedelta(seconds=int(eta))) if eta is not None else 'unknown'
+        print(f"Backfill: {finished}/{total} dates, {self.requests_made} requests "
+              f"({rate:.1f}/s), ETA {eta_str}")
+
+    def run(self):
+        pending_dates = [d for d in self.dates if d not in self.done]
+        total = len(self.dates)
+        self.already_done = total - len(pending_dates)
+        started = time.monotonic()
+        print(f"Backfill: {len(pending_dates)} of {total} dates remaining")
+
+        # Track outstanding summaries per date so a date is checkpointed
+        # only once everything it depends on has been written
+        outstanding = {}
+        futures = {}
+        pool = ThreadPoolExecutor(max_workers=self.workers)
+        try:
+            for date_str in pending_dates:
+                futures[pool.submit(self.fetch_scoreboard, date_str)] = ('scoreboard', date_str)
+
+            last_report = 0
+            while futures:
+                finished, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    kind, date_str = futures.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        print(f"Backfill error for {date_str}: {e}")
+                        self.failed_dates.add(date_str)
+                        continue
+
+                    if kind == 'scoreboard':
+                        result, settled = result
+                        if not settled:
+                            self.unsettled_dates.add(date_str)
+                        outstanding[date_str] = len(result)
+                        for game_id in result:
+                            futures[pool.submit(self.fetch_summary, game_id)] = ('summary', date_str)
+                    else:
+                        outstanding[date_str] -= 1
+
+                    if (outstanding[date_str] == 0 and date_str not in self.failed_dates
+                            and date_str not in self.unsettled_dates):
+                        self.done.add(date_str)
+                        self.save_checkpoint()
+
+                if time.monotonic() - last_report >= 5:
+                    self.report(started, total)
+                    last_report = time.monotonic()
+        except KeyboardInterrupt:
+            # Drop queued work and tell in-flight fetches to give up rather
+            # than waiting on them; unfinished dates stay out of the checkpoint
+            self.stopping.set()
+            pool.shutdown(wait=False, cancel_futures=True)
+            raise
+        pool.shutdown()
+
+        self.report(started, total)
+        if self.failed_dates:
+            print(f"Backfill: {len(self.failed_dates)} dates failed; re-run to retry them")
+        if self.unsettled_dates:
+            print(f"Backfill: {len(self.unsettled_dates)} dates still have unfinished games; "
+                  f"re-run later to complete them")
+        return 0 if not self.failed_dates else 1
+
+
+def run_backfill_cli(argv):
+    """python nba-backend.py backfill --season 2025"""
+    now = datetime.now()
+    parser = argparse.ArgumentParser(prog='nba-backend.py backfill',
+                                     description='Backfill a season of ESPN scoreboards and box scores')
+    parser.add_argument('--season', type=int, default=now.year if now.month >= 10 else now.year - 1,
+                        help='season start year, e.g. 2025 for 2025-26')
+    parser.add_argument('--workers', type=int, default=8, help='concurrent requests')
+    parser.add_argument('--checkpoint', help='checkpoint file (default: inside the archive)')
+    args = parser.parse_args(argv)
+
+    backfill = SeasonBackfill(season_dates(args.season), workers=args.workers,
+                              checkpoint=args.checkpoint)
+    try:
+        return backfill.run()
+    except KeyboardInterrupt:
+        print("Backfill interrupted; re-run to resume from the checkpoint")
+        return 130
+
+# ========================================
+# TEAM / PLAYER INDEXES
+# ========================================
+def normalize_name(name):
+    """Lowercase, accent-free, punctuation-free form used for name search"""
+    name = unicodedata.normalize('NFKD', name or '')
+    name = ''.join(c for c in name if not unicodedata.combining(c)).lower()
+    return ' '.join(''.join(c if c.isalnum() else ' ' for c in name).split())
+
+
+def _stat_int(value):
+    try:
+        return int(value) if value and value != '--' else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+INDEX_SYNC_SECONDS = 30
+SUMMARY_RETRY_SECONDS = 60
+
+
+def extract_game(data, game_id):
+    """Reduce a completed summary to the compact entry the index stores.
+
+    Returns None while the game is not yet final. The entry is what gets
+    saved under archive/index, so workers never re-parse raw box scores.
+    """
+    header = data.get('header', {})
+    comp = header.get('competitions', [{}])[0]
+    game_id = str(header.get('id') or game_id)
+    if not comp.get('status', {}).get('type', {}).get('completed'):
+        return None
+
+    date = comp.get('date', '')
+    game = None
+    if len(comp.get('competitors', [])) == 2:
+        home, away = _home_away(comp['competitors'])
+        game = _game_entry(game_id, date, home, away)
+
+    rows = []
+    teams = [t.get('team', {}).get('abbreviation') for t in data.get('boxscore', {}).get('players', [])]
+    for team_data in data.get('boxscore', {}).get('players', []):
+        team_abbr = team_data.get('team', {}).get('abbreviation', 'N/A')
+        opponent = next((t for t in teams if t != team_abbr), None)
+        for stat_group in team_data.get('statistics', []):
+            keys = stat_group.get('keys', [])
+            for athlete in stat_group.get('athletes', []):
+                stats = athlete.get('stats', [])
+                info = athlete.get('athlete', {})
+                player_id = info.get('id')
+                if not player_id or athlete.get('didNotPlay') or not stats:
+                    continue
+                row = dict(zip(keys, stats))
+                rows.append({
+                    'playerId': player_id,
+                    'name': info.get('displayName', ''),
+                    'row': {
+                        'gameId': game_id,
+                        'date': date,
+                        'team': team_abbr,
+                        'opponent': opponent,
+                        'starter': bool(athlete.get('starter')),
+                        'points': _stat_int(row.get('points')),
+                        'rebounds': _stat_int(row.get('rebounds')),
+                        'assists': _stat_int(row.get('assists')),
+                        'stats': row
+                    }
+                })
+
+    return {'id': game_id, 'game': game, 'rows': rows}
+
+
+class GameIndex:
+    """Inverted indexes over final games and box scores.
+
+    team -> games and player -> game log rows are kept as date-sorted lists,
+    and player names live in a sorted key list so prefix search is a bisect.
+    Each final is stored once as a compact entry under archive/index; a
+    background indexer thread loads those at startup, handles finals handed
+    to it by request handlers (fetching each new final's box score) and
+    periodically re-syncs the archive so finals seen by other workers or the
+    backfill show up here too. Lookups never wait for loading to finish;
+    `partial` is True until the first sync completes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.ready = threading.Event()
+        self.pending = queue.Queue(maxsize=100)
+        self.archive_seen = {}
+        self.summary_attempts = {}
+        self.games = {}
+        self.team_games = {}
+        self.player_games = {}
+        self.player_rows = {}
+        self.players = {}
+        self.summaries = set()
+        self.name_keys = []
+
+    @property
+    def partial(self):
+        return not self.ready.is_set()
+
+    def submit(self, kind, key, data):
+        """Queue a scoreboard or summary payload for the indexer thread"""
+        try:
+            self.pending.put_nowait((kind, key, data))
+        except queue.Full:
+            pass
+
+    def start(self):
+        thread = threading.Thread(target=self._run, name='game-indexer', daemon=True)
+        thread.start()
+        return thread
+
+    def _run(self):
+        last_sync = 0
+        while True:
+            if time.monotonic() - last_sync >= INDEX_SYNC_SECONDS:
+                self.sync_archive()
+                last_sync = time.monotonic()
+            try:
+                kind, key, data = self.pending.get(timeout=INDEX_SYNC_SECONDS)
+            except queue.Empty:
+                continue
+            try:
+                if kind == 'scoreboard':
+                    self._handle_scoreboard(key, data)
+                else:
+                    self._handle_summary(key, data)
+            except Exception as e:
+                print(f"Error indexing {kind} {key}: {e}")
+
+    def sync_archive(self):
+        """Index entries written since the last sync, by any process"""
+        for filename in self._listdir('index'):
+            path = archive_path('index', filename[:-5])
+            if path in self.archive_seen:
+                continue
+            try:
+                entry = load_archived('index', filename[:-5])
+                with self.lock:
+                    self._ingest_entry(entry)
+                self.archive_seen[path] = True
+            except Exception as e:
+                print(f"Error indexing {filename}: {e}")
+
+        # Raw summaries without an entry yet (e.g. from the backfill) are
+        # parsed once here and saved compactly for every other worker
+        for filename in self._listdir('summary'):
+            game_id = filename[:-5]
+            path = archive_path('summary', game_id)
+            if game_id in self.summaries or os.path.exists(archive_path('index', game_id)):
+                continue
+            try:
+                mtime = os.path.getmtime(path)
+                if self.archive_seen.get(path) == mtime:
+                    continue
+                self.archive_seen[path] = mtime
+                self._handle_summary(game_id, load_archived('summary', game_id))
+            except Exception as e:
+                print(f"Error indexing summary {filename}: {e}")
+        self.ready.set()
+
+    def _listdir(self, kind):
+        directory = os.path.join(ARCHIVE_DIR, kind)
+        if not os.path.isdir(directory):
+            return []
+        return [name for name in os.listdir(directory) if name.endswith('.json')]
+
+    def _handle_scoreboard(self, date_str, data):
+        with self.lock:
+            self._ingest_scoreboard(data)
+            missing = [event['id'] for event in data.get('events', [])
+                       if event['competitions'][0]['status']['type']['name'] == 'STATUS_FINAL'
+                       and event['id'] not in self.summaries]
+
+        for game_id in missing:
+            last_attempt = self.summary_attempts.get(game_id, 0)
+            if time.monotonic() - last_attempt < SUMMARY_RETRY_SECONDS:
+                continue
+            self.summary_attempts[game_id] = time.monotonic()
+            summary = load_archived('summary', game_id)
+            if summary is None:
+                summary = fetch_json(f"{ESPN_API}/summary?event={game_id}",
+                                     priority=PRIORITY_BACKGROUND, max_wait=5.0)
+            self._handle_summary(game_id, summary)
+
+        # Only settled scoreboards may go where the backfill will trust them
+        path = archive_path('scoreboard', date_str)
+        if scoreboard_settled(data) and not os.path.exists(path):
+            _write_json(path, data)
+
+    def _handle_summary(self, game_id, data):
+        entry = extract_game(data, game_id)
+        if entry is None:
+            return
+        with self.lock:
+            added = self._ingest_entry(entry)
+        if not added:
+            return
+        for kind, payload in (('summary', data), ('index', entry)):
+            path = archive_path(kind, entry['id'])
+            if not os.path.exists(path):
+                _write_json(path, payload)
+        self.archive_seen[archive_path('index', entry['id'])] = True
+
+    def _ingest_scoreboard(self, data):
+        for event in data.get('events', []):
+            comp = event['competitions'][0]
+            if comp['status']['type']['name'] != 'STATUS_FINAL' or event['id'] in self.games:
+                continue
+            home, away = _home_away(comp['competitors'])
+            self._add_game(_game_entry(event['id'], event.get('date', ''), home, away))
+
+    def _ingest_entry(self, entry):
+        if entry['id'] in self.summaries:
+            return False
+        self.summaries.add(entry['id'])
+        if entry['game'] and entry['id'] not in self.games:
+            self._add_game(entry['game'])
+        for player in entry['rows']:
+            self._add_player_row(player['playerId'], player['name'], player['row'])
+        return True
+
+    def _add_game(self, game):
+        self.games[game['id']] = game
+        for abbr in (game['homeAbbr'], game['awayAbbr']):
+            bisect.insort(self.team_games.setdefault((abbr or '').upper(), []), (game['date'], game['id']))
+
+    def _add_player_row(self, player_id, name, row):
+        if player_id not in self.players:
+            self.players[player_id] = name
+            key = normalize_name(name)
+            tokens = key.split()
+            # Index the full name plus each later token so "jam" finds LeBron James
+            for i in range(len(tokens)):
+                bisect.insort(self.name_keys, (' '.join(tokens[i:]), player_id))
+        bisect.insort(self.player_games.setdefault(player_id, []), (row['date'], row['gameId']))
+        self.player_rows.setdefault(player_id, {})[row['gameId']] = row
+
+    def team_log(self, abbr, limit):
+        with self.lock:
+            entries = self.team_games.get(abbr.upper(), [])[-limit:] if limit > 0 else []
+            return [dict(self.games[game_id]) for _, game_id in reversed(entries)]
+
+    def player_name(self, player_id):
+        with self.lock:
+            return self.players.get(player_id)
+
+    def player_log(self, player_id, limit):
+        with self.lock:
+            entries = self.player_games.get(player_id, [])[-limit:] if limit > 0 else []
+            rows = self.player_rows.get(player_id, {})
+            return [dict(rows[game_id]) for _, game_id in reversed(entries)]
+
+    def search(self, query, limit):
+        prefix = normalize_name(query)
+        if not prefix:
+            return []
+        with self.lock:
+            results = []
+            seen = set()
+            i = bisect.bisect_left(self.name_keys, (prefix,))
+            while i < len(self.name_keys) and len(results) < limit:
+                key, player_id = self.name_keys[i]
+                if not key.startswith(prefix):
+                    break
+                if player_id not in seen:
+                    seen.add(player_id)
+                    results.append({
+                        'id': player_id,
+                        'name': self.players[player_id],
+                        'games': len(self.player_games.get(player_id, []))
+                    })
+                i += 1
+            return results
+
+
+def _game_entry(game_id, date, home, away):
+    return {
+        'id': game_id,
+        'date': date,
+        'home': home['team'].get('displayName'),
+        'away': away['team'].get('displayName'),
+        'homeAbbr': home['team'].get('abbreviation'),
+        'awayAbbr': away['team'].get('abbreviation'),
+        'homeScore': _stat_int(_score(home)),
+        'awayScore': _stat_int(_score(away))
+    }
+
+
+def _home_away(competitors):
+    """Return (home, away), falling back to ESPN's usual home-first ordering"""
+    home = next((c for c in competitors if c.get('homeAway') == 'home'), competitors[0])
+    away = next((c for c in competitors if c.get('homeAway') == 'away'), competitors[1])
+    return home, away
+
+
+def _score(competitor):
+    score = competitor.get('score', 0)
+    return score.get('value', 0) if isinstance(score, dict) else score
+
+
+def index_scoreboard(data, date_str):
+    """Hand a live scoreboard to the indexer without blocking the request"""
+    game_index.submit('scoreboard', date_str, data)
+
+
+def index_summary(game_id, data):
+    """Hand a box score to the indexer without blocking the request"""
+    game_index.submit('summary', game_id, data)
+
+
+game_index = GameIndex()
+
+@app.route('/api/teams/<abbr>/games', methods=['GET'])
+def get_team_games(abbr):
+    """Get a team's most recent final games"""
+    try:
+        limit = request.args.get('limit', 10, type=int)
+        return jsonify({
+            'success': True,
+            'team': abbr.upper(),
+            'games': game_index.team_log(abbr, limit),
+            'partial': game_index.partial
+        })
+    except Exception as e:
+        print(f"Team games error: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/players/<player_id>/gamelog', methods=['GET'])
+def get_player_gamelog(player_id):
+    """Get a player's per-game stat lines, most recent first"""
+    try:
+        limit = request.args.get('limit', 20, type=int)
+        games = game_index.player_log(player_id, limit)
+        return jsonify({
+            'success': True,
+            'id': player_id,
+            'name': game_index.player_name(player_id),
+            'games': games,
+            'partial': game_index.partial
+        })
+    except Exception as e:
+        print(f"Player game log error: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
+@app.route('/api/search', methods=['GET'])
+def search_players():
+    """Search players by name prefix"""
+    try:
+        query = request.args.get('q', '')
+        limit = request.args.get('limit', 10, type=int)
+        return jsonify({'success': True, 'players': game_index.search(query, limit), 'partial': game_index.partial})
+    except Exception as e:
+        print(f"Search error: {e}")
+        return jsonify({'success': False, 'error': str(e)})
+
 # ========================================
 # HEALTH CHECK
 # ========================================
@@ -721,5 +1852,17 @@ def get_betting():
 def health():
     return jsonify({'status': 'healthy', 'timestamp': datetime.now().isoformat()})
 
+# ========================================
+# BACKGROUND JOBS
+# ========================================
+# Started at import so they run under gunicorn as well as `python nba-backend.py`
+if sys.argv[1:2] != ['backfill']:
+    if ODDS_REFRESH_SECONDS > 0:
+        start_odds_refresher(ODDS_REFRESH_SECONDS)
+    game_index.start()
+
 if __name__ == '__main__':
+    if sys.argv[1:2] == ['backfill']:
+        sys.exit(run_backfill_cli(sys.argv[2:]))
+
     app.run(host='0.0.0.0', port=5000)